@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+Critical CSS post-build stage
+Inlines above-the-fold rules of the Astro landing into <head>
+and switches the full stylesheet to asynchronous loading
+"""
+
+import argparse
+import re
+import sys
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from pathlib import Path
+
+VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "source", "track", "wbr",
+}
+# At-rules whose blocks hold ordinary style rules and can be descended into
+GROUPING_AT_RULES = {"@media", "@supports", "@layer", "@container"}
+MARKER = "data-critical"
+
+STYLESHEET_LINK_RE = re.compile(
+    r'<link\b(?=[^>]*\brel=["\']?stylesheet["\']?)[^>]*>', re.IGNORECASE
+)
+CRITICAL_STYLE_RE = re.compile(rf"<style\b[^>]*\b{MARKER}\b[^>]*>", re.IGNORECASE)
+HREF_RE = re.compile(r'\bhref=["\']?([^"\'\s>]+)', re.IGNORECASE)
+
+
+@dataclass
+class Rule:
+    """Style rule with the at-rule preludes that wrap it"""
+    selectors: list[str]
+    body: str
+    context: tuple[str, ...] = ()
+
+
+@dataclass
+class SelectorIndex:
+    """Rules of one stylesheet keyed by the most selective token of each selector"""
+    rules: list[Rule]
+    tokens: list[list[frozenset[str]]] = field(default_factory=list)
+    by_key: dict[str, list[tuple[int, int]]] = field(default_factory=dict)
+    universal: list[tuple[int, int]] = field(default_factory=list)
+
+    @classmethod
+    def build(cls, css: str) -> "SelectorIndex":
+        index = cls(rules=parse_css(css))
+        for rule_no, rule in enumerate(index.rules):
+            rule_tokens = [selector_tokens(s) for s in rule.selectors]
+            index.tokens.append(rule_tokens)
+            for sel_no, tokens in enumerate(rule_tokens):
+                key = _index_key(tokens)
+                if key is None:
+                    index.universal.append((rule_no, sel_no))
+                else:
+                    index.by_key.setdefault(key, []).append((rule_no, sel_no))
+        return index
+
+    def critical_css(self, page_tokens: set[str]) -> str:
+        """Serialize the rules whose selectors can match the given tokens"""
+        hits = list(self.universal)
+        for key in page_tokens:
+            hits.extend(self.by_key.get(key, ()))
+
+        matched: dict[int, list[int]] = {}
+        for rule_no, sel_no in hits:
+            if self.tokens[rule_no][sel_no] <= page_tokens:
+                matched.setdefault(rule_no, []).append(sel_no)
+
+        out: list[str] = []
+        context: tuple[str, ...] = ()
+        for rule_no in sorted(matched):
+            rule = self.rules[rule_no]
+            # Reopen only the at-rule blocks that differ from the previous rule
+            common = 0
+            while (common < min(len(context), len(rule.context))
+                   and context[common] == rule.context[common]):
+                common += 1
+            out.append("}" * (len(context) - common))
+            out.extend(prelude + "{" for prelude in rule.context[common:])
+            context = rule.context
+            selectors = ",".join(rule.selectors[i] for i in sorted(matched[rule_no]))
+            out.append(f"{selectors}{{{rule.body}}}")
+        out.append("}" * len(context))
+        return "".join(out)
+
+
+def _skip_string(css: str, pos: int) -> int:
+    """Return the position right after the quoted string starting at pos"""
+    quote = css[pos]
+    pos += 1
+    while pos < len(css) and css[pos] != quote:
+        pos += 2 if css[pos] == "\\" else 1
+    return pos + 1
+
+
+def _find_block_end(css: str, pos: int) -> int:
+    """Return the index of the brace closing the block opened right before pos"""
+    depth = 1
+    while pos < len(css):
+        char = css[pos]
+        if char in "\"'":
+            pos = _skip_string(css, pos)
+            continue
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return pos
+        pos += 1
+    return pos
+
+
+def _split_top_level(text: str, sep: str) -> list[str]:
+    """Split on sep outside of brackets, parentheses and strings"""
+    parts, depth, start, pos = [], 0, 0, 0
+    while pos < len(text):
+        char = text[pos]
+        if char in "\"'":
+            pos = _skip_string(text, pos)
+            continue
+        if char == "\\":
+            pos += 2
+            continue
+        if char in "([":
+            depth += 1
+        elif char in ")]":
+            depth -= 1
+        elif char == sep and depth == 0:
+            parts.append(text[start:pos])
+            start = pos + 1
+        pos += 1
+    parts.append(text[start:])
+    return [p.strip() for p in parts if p.strip()]
+
+
+def parse_css(css: str, context: tuple[str, ...] = ()) -> list[Rule]:
+    """Flatten a stylesheet into style rules, descending into grouping at-rules"""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.DOTALL)
+    rules: list[Rule] = []
+    pos = 0
+    while pos < len(css):
+        start = pos
+        # Scan the prelude up to the opening brace or a statement terminator
+        while pos < len(css) and css[pos] not in "{;":
+            pos = _skip_string(css, pos) if css[pos] in "\"'" else pos + 1
+        prelude = css[start:pos].strip()
+        if pos >= len(css) or css[pos] == ";":
+            pos += 1
+            continue
+        end = _find_block_end(css, pos + 1)
+        body = css[pos + 1:end]
+        pos = end + 1
+        if prelude.startswith("@"):
+            name = prelude.split(None, 1)[0].lower()
+            if name in GROUPING_AT_RULES:
+                rules.extend(parse_css(body, context + (prelude,)))
+            # @font-face, @keyframes and friends stay in the async stylesheet
+            continue
+        selectors = _split_top_level(prelude, ",")
+        if selectors:
+            rules.append(Rule(selectors, body.strip(), context))
+    return rules
+
+
+def _read_ident(selector: str, pos: int) -> tuple[str, int]:
+    """Read a CSS identifier starting at pos, resolving backslash escapes"""
+    chars = []
+    while pos < len(selector):
+        char = selector[pos]
+        if char == "\\" and pos + 1 < len(selector):
+            hex_match = re.match(r"[0-9a-fA-F]{1,6} ?", selector[pos + 1:])
+            if hex_match:
+                chars.append(chr(int(hex_match.group().strip(), 16)))
+                pos += 1 + len(hex_match.group())
+            else:
+                chars.append(selector[pos + 1])
+                pos += 2
+        elif char.isalnum() or char in "-_" or ord(char) > 127:
+            chars.append(char)
+            pos += 1
+        else:
+            break
+    return "".join(chars), pos
+
+
+def selector_tokens(selector: str) -> frozenset[str]:
+    """
+    Reduce a selector to the classes (.x), ids (#x) and tag names it requires.
+    Pseudo-classes, attribute selectors and functional arguments are ignored,
+    so the match is conservative: a rule may be kept when it does not apply,
+    but never dropped when it does.
+    """
+    tokens = set()
+    pos, compound_start = 0, True
+    while pos < len(selector):
+        char = selector[pos]
+        if char in "([":
+            depth, pos = 1, pos + 1
+            while pos < len(selector) and depth:
+                if selector[pos] == "\\":
+                    pos += 2
+                    continue
+                depth += selector[pos] in "(["
+                depth -= selector[pos] in ")]"
+                pos += 1
+            compound_start = False
+        elif char in ".#":
+            ident, pos = _read_ident(selector, pos + 1)
+            tokens.add(char + ident)
+            compound_start = False
+        elif char == ":":
+            _, pos = _read_ident(selector, pos + 1 + (selector[pos + 1:pos + 2] == ":"))
+            compound_start = False
+        elif char in " >+~\t\n":
+            pos += 1
+            compound_start = True
+        elif compound_start and (char.isalpha() or char in "-_\\"):
+            ident, pos = _read_ident(selector, pos)
+            tokens.add(ident.lower())
+            compound_start = False
+        else:
+            pos += 1
+            compound_start = False
+    return frozenset(tokens)
+
+
+def _index_key(tokens: frozenset[str]):
+    """Pick the most selective token: a class, then an id, then a tag name"""
+    for prefix in (".", "#"):
+        candidates = sorted(t for t in tokens if t.startswith(prefix))
+        if candidates:
+            return candidates[0]
+    return min(tokens) if tokens else None
+
+
+class FoldCollector(HTMLParser):
+    """Collect tag names, classes and ids of the elements above the fold"""
+
+    def __init__(self, fold_sections: int):
+        super().__init__(convert_charrefs=True)
+        self.fold_sections = fold_sections
+        self.tokens: set[str] = set()
+        self.stack: list[str] = []
+        self.capture_depth = None
+        self.main_depth = None
+        self.main_children = 0
+
+    def _add(self, tag: str, attrs):
+        self.tokens.add(tag)
+        for name, value in attrs:
+            if name == "class" and value:
+                self.tokens.update("." + c for c in value.split())
+            elif name == "id" and value:
+                self.tokens.add("#" + value)
+
+    def handle_starttag(self, tag, attrs):
+        depth = len(self.stack)
+        if self.capture_depth is None:
+            if tag in ("html", "body"):
+                self._add(tag, attrs)
+            elif tag == "header" or (
+                self.main_depth is not None
+                and depth == self.main_depth + 1
+                and self.main_children < self.fold_sections
+            ):
+                if self.main_depth is not None and depth == self.main_depth + 1:
+                    self.main_children += 1
+                self.capture_depth = depth
+            elif tag == "main":
+                self._add(tag, attrs)
+                self.main_depth = depth
+        if self.capture_depth is not None:
+            self._add(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.stack.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        if self.capture_depth is not None:
+            self._add(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if tag not in self.stack:
+            return
+        while self.stack:
+            if self.stack.pop() == tag:
+                break
+        depth = len(self.stack)
+        if self.capture_depth is not None and depth <= self.capture_depth:
+            self.capture_depth = None
+        if self.main_depth is not None and depth <= self.main_depth:
+            self.main_depth = None
+
+
+def _resolve_href(dist: Path, href: str):
+    """Map a stylesheet href to a file in dist, tolerating the Astro `base` prefix"""
+    if "://" in href or href.startswith("//"):
+        return None
+    parts = href.split("?", 1)[0].split("#", 1)[0].lstrip("/").split("/")
+    for skip in range(len(parts)):
+        candidate = dist.joinpath(*parts[skip:])
+        if candidate.is_file():
+            return candidate
+    return None
+
+
+def _async_link(tag: str) -> str:
+    """Turn a blocking stylesheet link into preload + noscript fallback"""
+    preload = re.sub(r'\brel=["\']?stylesheet["\']?', 'rel="preload" as="style"', tag,
+                     flags=re.IGNORECASE)
+    preload = preload[:-1].rstrip("/ ") + ' onload="this.onload=null;this.rel=\'stylesheet\'">'
+    return f"{preload}<noscript>{tag}</noscript>"
+
+
+def process_page(page: Path, dist: Path, indexes: dict, fold_sections: int) -> int:
+    """Inline critical CSS into one page, return the inlined size in bytes"""
+    html = page.read_text(encoding="utf-8")
+    if CRITICAL_STYLE_RE.search(html):
+        return 0
+    links = [
+        (m.group(0), _resolve_href(dist, HREF_RE.search(m.group(0)).group(1)))
+        for m in STYLESHEET_LINK_RE.finditer(html)
+        if HREF_RE.search(m.group(0))
+    ]
+    links = [(tag, path) for tag, path in links if path is not None]
+    if not links:
+        return 0
+
+    collector = FoldCollector(fold_sections)
+    collector.feed(html)
+    critical = []
+    for _, path in links:
+        if path not in indexes:
+            indexes[path] = SelectorIndex.build(path.read_text(encoding="utf-8"))
+        critical.append(indexes[path].critical_css(collector.tokens))
+    css = "".join(critical)
+
+    # The inline copy goes before the first stylesheet, so the full sheet still
+    # wins the cascade once loaded and responsive overrides keep working
+    style = f"<style {MARKER}>{css}</style>"
+    for i, (tag, _) in enumerate(links):
+        html = html.replace(tag, (style if i == 0 else "") + _async_link(tag), 1)
+    page.write_text(html, encoding="utf-8")
+    return len(css.encode("utf-8"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("dist", nargs="?", default="apps/landing/dist",
+                        help="Astro build output (default: apps/landing/dist)")
+    parser.add_argument("--fold-sections", type=int, default=2,
+                        help="top-level <main> children treated as above the fold")
+    args = parser.parse_args(argv)
+
+    dist = Path(args.dist)
+    if not dist.is_dir():
+        print(f"✗ Not a directory: {dist}", file=sys.stderr)
+        return 1
+
+    indexes: dict[Path, SelectorIndex] = {}
+    pages = sorted(dist.rglob("*.html"))
+    for page in pages:
+        size = process_page(page, dist, indexes, args.fold_sections)
+        if size:
+            print(f"✓ Inlined {size} B critical CSS: {page.relative_to(dist)}")
+    print(f"\n{len(pages)} pages, {len(indexes)} stylesheets indexed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
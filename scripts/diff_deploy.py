@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Delta deploy for the assembled site
+Hashes _site/ into a manifest, compares it with the manifest of the previous
+deploy and publishes only added/changed files plus a deletion list
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import mimetypes
+import os
+import shutil
+import sys
+import tarfile
+from pathlib import Path
+
+MANIFEST_NAME = ".deploy-manifest.json"
+MANIFEST_VERSION = 1
+
+
+def build_manifest(site: Path) -> dict[str, str]:
+    """Map every file of the site (POSIX relative path) to its sha256"""
+    manifest = {}
+    for path in sorted(site.rglob("*")):
+        if path.is_file() and path.name != MANIFEST_NAME:
+            digest = hashlib.sha256()
+            with path.open("rb") as fh:
+                for chunk in iter(lambda: fh.read(1 << 16), b""):
+                    digest.update(chunk)
+            manifest[path.relative_to(site).as_posix()] = digest.hexdigest()
+    return manifest
+
+
+def diff_manifests(old: dict[str, str], new: dict[str, str]):
+    """Return (added, changed, deleted) path lists"""
+    added = sorted(p for p in new if p not in old)
+    changed = sorted(p for p in new if p in old and old[p] != new[p])
+    deleted = sorted(p for p in old if p not in new)
+    return added, changed, deleted
+
+
+def _dump_manifest(files: dict[str, str]) -> bytes:
+    return json.dumps(
+        {"version": MANIFEST_VERSION, "files": files}, indent=1, sort_keys=True
+    ).encode("utf-8")
+
+
+def _load_manifest(data) -> dict[str, str]:
+    if data is None:
+        return {}
+    manifest = json.loads(data)
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError(f"Unsupported manifest version: {manifest.get('version')}")
+    return manifest["files"]
+
+
+def upload_order(paths: list[str]) -> list[str]:
+    """Put HTML last, so pages never reference assets that are not uploaded yet"""
+    return sorted(paths, key=lambda p: (p.endswith(".html"), p))
+
+
+class LocalTarget:
+    """
+    Deploy target backed by a directory, e.g. a mirror served by nginx.
+    The manifest lives beside the directory (<root>.manifest.json),
+    so the served tree does not publish the file/hash listing.
+    """
+
+    def __init__(self, root: str):
+        self.root = Path(root).resolve()
+        if not self.root.name:
+            raise SystemExit(f"✗ Refusing to deploy into {self.root}")
+        self.manifest = self.root.with_name(self.root.name + ".manifest.json")
+
+    def read_manifest(self):
+        if self.manifest.is_file():
+            return self.manifest.read_bytes()
+        # No manifest but a populated mirror: diff against what is actually
+        # served, so files missing from the site still get deleted
+        if self.root.is_dir() and any(self.root.iterdir()):
+            return _dump_manifest(build_manifest(self.root))
+        return None
+
+    def upload(self, rel: str, source: Path):
+        """Copy under a temporary name and rename, so readers never see a partial file"""
+        target = self.root / rel
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+        shutil.copy2(source, tmp)
+        os.replace(tmp, target)
+
+    def delete(self, rel: str):
+        path = self.root / rel
+        path.unlink(missing_ok=True)
+        # Drop directories left empty by the deletion
+        for parent in path.parents:
+            if parent == self.root or not parent.is_dir() or any(parent.iterdir()):
+                break
+            parent.rmdir()
+
+    def write_manifest(self, data: bytes):
+        self.manifest.parent.mkdir(parents=True, exist_ok=True)
+        self.manifest.write_bytes(data)
+
+
+class S3Target:
+    """
+    Deploy target backed by an S3-compatible bucket (AWS, MinIO, Yandex Object Storage).
+    The manifest is stored as <prefix>/.deploy-manifest.json; deny public
+    reads of that key when the bucket is served directly.
+    """
+
+    def __init__(self, url: str, endpoint_url=None):
+        try:
+            import boto3
+        except ImportError:
+            raise SystemExit("✗ S3 targets need boto3: pip install boto3")
+        bucket, _, prefix = url[len("s3://"):].partition("/")
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+        self.client = boto3.client("s3", endpoint_url=endpoint_url or None)
+
+    def read_manifest(self):
+        try:
+            obj = self.client.get_object(Bucket=self.bucket, Key=self.prefix + MANIFEST_NAME)
+        except self.client.exceptions.NoSuchKey:
+            return None
+        return obj["Body"].read()
+
+    def upload(self, rel: str, source: Path):
+        content_type = mimetypes.guess_type(rel)[0] or "application/octet-stream"
+        self.client.upload_file(
+            str(source), self.bucket, self.prefix + rel,
+            ExtraArgs={"ContentType": content_type},
+        )
+
+    def delete(self, rel: str):
+        self.client.delete_object(Bucket=self.bucket, Key=self.prefix + rel)
+
+    def write_manifest(self, data: bytes):
+        self.client.put_object(
+            Bucket=self.bucket, Key=self.prefix + MANIFEST_NAME,
+            Body=data, ContentType="application/json",
+        )
+
+
+def open_target(target: str, endpoint_url=None):
+    """Pick the target implementation from its URL"""
+    if target.startswith("s3://"):
+        return S3Target(target, endpoint_url)
+    return LocalTarget(target)
+
+
+def write_bundle(bundle: Path, site: Path, upload: list[str], deleted: list[str], manifest: bytes):
+    """Pack the delta into a tar.gz: changed files under site/, plus deleted.txt and the manifest"""
+    bundle.parent.mkdir(parents=True, exist_ok=True)
+
+    def add_bytes(tar, name, data):
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        tar.addfile(info, io.BytesIO(data))
+
+    with tarfile.open(bundle, "w:gz") as tar:
+        for rel in upload:
+            tar.add(site / rel, arcname=f"site/{rel}")
+        add_bytes(tar, "deleted.txt", "".join(p + "\n" for p in deleted).encode("utf-8"))
+        add_bytes(tar, MANIFEST_NAME, manifest)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("site", nargs="?", default="_site",
+                        help="assembled deploy artifact (default: _site)")
+    parser.add_argument("--target", required=True,
+                        help="directory or s3://bucket/prefix holding the previous deploy")
+    parser.add_argument("--endpoint-url", default=None,
+                        help="S3-compatible endpoint, e.g. http://localhost:9000 for MinIO")
+    parser.add_argument("--bundle", default=None,
+                        help="also write the delta as a tar.gz bundle")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="report the delta without touching the target")
+    args = parser.parse_args(argv)
+
+    site = Path(args.site)
+    if not site.is_dir():
+        print(f"✗ Not a directory: {site}", file=sys.stderr)
+        return 1
+
+    target = open_target(args.target, args.endpoint_url)
+    new = build_manifest(site)
+    old = _load_manifest(target.read_manifest())
+    added, changed, deleted = diff_manifests(old, new)
+    upload = upload_order(added + changed)
+    manifest = _dump_manifest(new)
+
+    print(f"{len(new)} files: {len(added)} added, {len(changed)} changed, "
+          f"{len(deleted)} deleted, {len(new) - len(upload)} unchanged")
+    if args.bundle:
+        write_bundle(Path(args.bundle), site, upload, deleted, manifest)
+        print(f"✓ Bundle: {args.bundle}")
+    if args.dry_run:
+        return 0
+
+    for rel in upload:
+        target.upload(rel, site / rel)
+        print(f"  + {rel}")
+    for rel in deleted:
+        target.delete(rel)
+        print(f"  - {rel}")
+    # The manifest goes last: an interrupted deploy is simply redone next time
+    target.write_manifest(manifest)
+    print(f"✓ Deployed to {args.target}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Minification stage for the combined deploy artifact
+Minifies HTML/CSS/JS across the assembled _site/ in a process pool,
+reusing a content-addressed cache between builds
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import shutil
+import sys
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+EXTENSIONS = (".html", ".css", ".js")
+WORD_CHARS = re.compile(r"[\w$\\]|[^\x00-\x7f]")
+# Keywords after which a slash starts a regex literal, not a division
+REGEX_KEYWORDS = {
+    "return", "typeof", "instanceof", "in", "of", "new", "delete", "void",
+    "throw", "case", "do", "else", "yield", "await",
+}
+RAW_HTML_BLOCK = re.compile(
+    r"(<(pre|textarea|script|style)\b[^>]*>)(.*?)(</\2\s*>)", re.IGNORECASE | re.DOTALL
+)
+SCRIPT_TYPE = re.compile(r'\btype=["\']?([^"\'\s>]+)', re.IGNORECASE)
+JS_TYPES = {"module", "text/javascript", "application/javascript"}
+
+
+def _skip_quoted(src: str, pos: int) -> int:
+    """Return the position right after the string literal starting at pos"""
+    quote = src[pos]
+    pos += 1
+    while pos < len(src) and src[pos] != quote:
+        if src[pos] == "\\":
+            pos += 1
+        elif src[pos] == "\n" and quote != "`":
+            break
+        pos += 1
+    return pos + 1
+
+
+def _skip_template(src: str, pos: int) -> int:
+    """Return the position right after the template literal starting at pos"""
+    pos += 1
+    while pos < len(src) and src[pos] != "`":
+        if src[pos] == "\\":
+            pos += 2
+            continue
+        if src.startswith("${", pos):
+            depth, pos = 1, pos + 2
+            while pos < len(src) and depth:
+                char = src[pos]
+                if char in "\"'":
+                    pos = _skip_quoted(src, pos)
+                    continue
+                if char == "`":
+                    pos = _skip_template(src, pos)
+                    continue
+                depth += char == "{"
+                depth -= char == "}"
+                pos += 1
+            continue
+        pos += 1
+    return pos + 1
+
+
+def _skip_regex(src: str, pos: int) -> int:
+    """Return the position right after the regex literal (and flags) starting at pos"""
+    pos += 1
+    in_class = False
+    while pos < len(src) and src[pos] != "\n":
+        char = src[pos]
+        if char == "\\":
+            pos += 2
+            continue
+        if char == "[":
+            in_class = True
+        elif char == "]":
+            in_class = False
+        elif char == "/" and not in_class:
+            pos += 1
+            break
+        pos += 1
+    while pos < len(src) and WORD_CHARS.match(src[pos]):
+        pos += 1
+    return pos
+
+
+def _regex_allowed(out: list[str]) -> bool:
+    """Tell whether a slash after the emitted code would open a regex literal"""
+    pos = len(out) - 1
+    while pos >= 0 and out[pos] in (" ", "\n"):
+        pos -= 1
+    if pos < 0:
+        return True
+    if out[pos][-1] in "(,=:[!&|?{};+-*%<>~^":
+        return True
+    # Walk back over the whole identifier: keywords may be any length
+    end = pos
+    while pos >= 0 and len(out[pos]) == 1 and re.match(r"[\w$]", out[pos]):
+        pos -= 1
+    return "".join(out[pos + 1:end + 1]) in REGEX_KEYWORDS
+
+
+def _ends_with_number(result: list[str]) -> bool:
+    """Tell whether the emitted code ends with a numeric literal such as 1 or 0x1f"""
+    pos = len(result) - 1
+    while pos >= 0 and len(result[pos]) == 1 and re.match(r"[\w$]", result[pos]):
+        pos -= 1
+    return pos + 1 < len(result) and result[pos + 1].isdigit()
+
+
+def _needs_space(prev: str, nxt: str) -> bool:
+    """Tell whether dropping the whitespace between two characters changes the tokens"""
+    if WORD_CHARS.match(prev) and WORD_CHARS.match(nxt):
+        return True
+    return prev == nxt and prev in "+-/" or (prev, nxt) in {("+", "+"), ("-", "-")}
+
+
+def minify_js(src: str) -> str:
+    """
+    Strip comments and redundant whitespace from JavaScript.
+    Line breaks are kept where they may end a statement, so automatic
+    semicolon insertion behaves exactly as in the source.
+    """
+    out: list[str] = []
+    pos, size = 0, len(src)
+    while pos < size:
+        char = src[pos]
+        if char in "\"'":
+            end = _skip_quoted(src, pos)
+        elif char == "`":
+            end = _skip_template(src, pos)
+        elif src.startswith("//", pos):
+            end = src.find("\n", pos)
+            pos = size if end == -1 else end
+            continue
+        elif src.startswith("/*", pos):
+            end = src.find("*/", pos + 2)
+            end = size if end == -1 else end + 2
+            # A comment spanning lines still separates statements
+            out.append("\n" if "\n" in src[pos:end] else " ")
+            pos = end
+            continue
+        elif char == "/" and _regex_allowed(out):
+            end = _skip_regex(src, pos)
+        elif char.isspace():
+            end = pos
+            while end < size and src[end].isspace():
+                end += 1
+            out.append("\n" if "\n" in src[pos:end] else " ")
+            pos = end
+            continue
+        else:
+            end = pos + 1
+        out.append(src[pos:end])
+        pos = end
+
+    # Second pass: decide which of the collapsed whitespace runs must stay
+    result: list[str] = []
+    pending = ""
+    for token in out:
+        if token in (" ", "\n"):
+            pending = "\n" if "\n" in (pending, token) else " "
+            continue
+        if pending and result:
+            prev, nxt = result[-1][-1], token[0]
+            # A "}" may close an object literal or arrow body where ASI ends the
+            # statement, so the line break after it stays
+            if pending == "\n" and prev not in "{;,([" and nxt not in "}),;]":
+                result.append("\n")
+            elif _needs_space(prev, nxt) or (nxt == "." and _ends_with_number(result)):
+                result.append(" ")
+        pending = ""
+        result.append(token)
+    return "".join(result)
+
+
+def minify_css(src: str) -> str:
+    """Strip comments and redundant whitespace from a stylesheet"""
+    out: list[str] = []
+    pos, size = 0, len(src)
+    while pos < size:
+        char = src[pos]
+        if char in "\"'":
+            end = _skip_quoted(src, pos)
+            out.append(src[pos:end])
+        elif char.isspace() or src.startswith("/*", pos):
+            # Whitespace and comments separate tokens alike: "0/**/auto" is "0 auto"
+            end = pos
+            while end < size:
+                if src[end].isspace():
+                    end += 1
+                elif src.startswith("/*", end):
+                    close = src.find("*/", end + 2)
+                    end = size if close == -1 else close + 2
+                else:
+                    break
+            prev = out[-1][-1:] if out else ""
+            nxt = src[end:end + 1]
+            # Spaces around ":" are kept: "a :hover" and "a:hover" differ
+            if prev and nxt and prev not in "{};,>" and nxt not in "{};,>":
+                out.append(" ")
+        else:
+            end = pos + 1
+            if char == "}" and out and out[-1] == ";":
+                out.pop()
+            out.append(char)
+        pos = end
+    return "".join(out).strip()
+
+
+def _minify_tag(tag: str) -> str:
+    """Collapse whitespace inside a tag, leaving quoted attribute values alone"""
+    return re.sub(r"(\"[^\"]*\"|'[^']*')|\s+", lambda m: m.group(1) or " ", tag)
+
+
+def _minify_markup(text: str) -> str:
+    """Minify HTML that contains no raw-text blocks"""
+    text = re.sub(r"<!--(?!\[if).*?-->", "", text, flags=re.DOTALL)
+    parts = re.split(r"(<[^>]*>)", text)
+    return "".join(
+        _minify_tag(part) if part.startswith("<") else re.sub(r"\s+", " ", part)
+        for part in parts
+    )
+
+
+def minify_html(src: str) -> str:
+    """Minify HTML, including inline styles and scripts; <pre>/<textarea> are kept verbatim"""
+    out: list[str] = []
+    pos = 0
+    for match in RAW_HTML_BLOCK.finditer(src):
+        out.append(_minify_markup(src[pos:match.start()]))
+        opening, tag, body, closing = match.groups()
+        tag = tag.lower()
+        if tag == "style":
+            body = minify_css(body)
+        elif tag == "script":
+            script_type = SCRIPT_TYPE.search(opening)
+            if not script_type or script_type.group(1).lower() in JS_TYPES:
+                body = minify_js(body)
+        out.append(_minify_tag(opening) + body + closing)
+        pos = match.end()
+    out.append(_minify_markup(src[pos:]))
+    return "".join(out).strip()
+
+
+MINIFIERS = {".html": minify_html, ".css": minify_css, ".js": minify_js}
+# Part of every cache key: outputs of an older minifier are never reused
+MINIFIER_VERSION = hashlib.sha256(Path(__file__).read_bytes()).hexdigest()[:12]
+# Lines this long only come out of a minifier; such files are not re-tokenized
+MAX_LINE_LENGTH = 1000
+
+
+def is_minified(path: Path, data: bytes) -> bool:
+    """Tell whether a file is bundler output or otherwise already minified"""
+    if ".min." in path.name or "_astro" in path.parts:
+        return True
+    return any(len(line) > MAX_LINE_LENGTH for line in data.splitlines())
+
+
+def _store(objects: Path, digest: str, data: bytes):
+    """Write a cache object atomically, so parallel workers never see partial files"""
+    target = objects / digest
+    if target.exists():
+        return
+    tmp = objects / f".{digest}.{os.getpid()}"
+    tmp.write_bytes(data)
+    os.replace(tmp, target)
+
+
+def minify_file(path: Path, objects: Path):
+    """
+    Minify one file in place, return (suffix, before, after, status, digests).
+    The cache maps the sha256 of a file to its minified bytes; minified
+    outputs are stored under their own hash too, so files that are already
+    minified are recognized and left untouched. digests lists the cache
+    objects the file relies on.
+    """
+    data = path.read_bytes()
+    if is_minified(path, data):
+        return path.suffix, len(data), len(data), "skipped", ()
+    digest = hashlib.sha256(data).hexdigest()
+    cached = objects / digest
+    if cached.exists():
+        result = cached.read_bytes()
+        if result != data:
+            path.write_bytes(result)
+        return path.suffix, len(data), len(result), "cached", (
+            digest, hashlib.sha256(result).hexdigest())
+
+    result = MINIFIERS[path.suffix](data.decode("utf-8")).encode("utf-8")
+    if len(result) >= len(data):
+        result = data
+    result_digest = hashlib.sha256(result).hexdigest()
+    _store(objects, digest, result)
+    _store(objects, result_digest, result)
+    if result != data:
+        path.write_bytes(result)
+    return path.suffix, len(data), len(result), "minified", (digest, result_digest)
+
+
+def _worker(args):
+    path, objects = args
+    try:
+        return minify_file(path, objects)
+    except UnicodeDecodeError:
+        size = path.stat().st_size
+        return path.suffix, size, size, "skipped", ()
+
+
+def prune_cache(cache: Path, objects: Path, used: set[str]) -> int:
+    """Drop other minifier versions and objects no current file relies on"""
+    removed = 0
+    for entry in cache.iterdir():
+        if entry.is_dir() and entry != objects:
+            shutil.rmtree(entry)
+    for entry in objects.iterdir():
+        if entry.name not in used:
+            entry.unlink()
+            removed += 1
+    return removed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("site", nargs="?", default="_site",
+                        help="assembled deploy artifact (default: _site)")
+    parser.add_argument("--cache", default=".cache/minify",
+                        help="content-hash cache directory (default: .cache/minify)")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    site = Path(args.site)
+    if not site.is_dir():
+        print(f"✗ Not a directory: {site}", file=sys.stderr)
+        return 1
+    cache = Path(args.cache)
+    objects = cache / f"objects-{MINIFIER_VERSION}"
+    objects.mkdir(parents=True, exist_ok=True)
+
+    files = sorted(p for p in site.rglob("*") if p.is_file() and p.suffix in EXTENSIONS)
+    statuses = ("minified", "cached", "skipped")
+    totals = defaultdict(lambda: dict.fromkeys(("files", "before", "after", *statuses), 0))
+    used: set[str] = set()
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        for ext, before, after, status, digests in pool.map(
+            _worker, ((p, objects) for p in files), chunksize=16
+        ):
+            total = totals[ext]
+            total["files"] += 1
+            total[status] += 1
+            total["before"] += before
+            total["after"] += after
+            used.update(digests)
+    removed = prune_cache(cache, objects, used)
+
+    print(f"{'type':<6}{'files':>7}{'cached':>8}{'skipped':>9}"
+          f"{'before':>12}{'after':>12}{'saved':>8}")
+    for ext in EXTENSIONS:
+        if ext not in totals:
+            continue
+        t = totals[ext]
+        saved = 100 * (t["before"] - t["after"]) / t["before"] if t["before"] else 0
+        print(f"{ext:<6}{t['files']:>7}{t['cached']:>8}{t['skipped']:>9}"
+              f"{t['before']:>12}{t['after']:>12}{saved:>7.1f}%")
+    print(f"\n{removed} stale cache objects pruned")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
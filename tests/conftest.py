@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Build scripts are plain files, not a package
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
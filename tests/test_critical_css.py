@@ -0,0 +1,78 @@
+from critical_css import FoldCollector, SelectorIndex, parse_css, process_page, selector_tokens
+
+
+def test_selector_tokens_unescape_tailwind_classes():
+    assert selector_tokens(r".md\:text-6xl") == {".md:text-6xl"}
+    assert selector_tokens(r".bg-white\/70") == {".bg-white/70"}
+    assert selector_tokens(r".py-1\.5") == {".py-1.5"}
+
+
+def test_selector_tokens_ignore_pseudo_classes_and_arguments():
+    assert selector_tokens(r".hover\:text-primary:hover") == {".hover:text-primary"}
+    assert selector_tokens("a:not(.x)::before") == {"a"}
+    assert selector_tokens("input[type=button]") == {"input"}
+    assert selector_tokens("main > section h1") == {"main", "section", "h1"}
+    assert selector_tokens("*,::backdrop") == frozenset()
+
+
+def test_parse_css_flattens_nested_at_rules():
+    rules = parse_css(
+        "/* c */@charset 'utf-8';a,b{x:1}"
+        "@layer base{@media (min-width:768px){.c{y:2}}}"
+        "@keyframes spin{to{z:3}}"
+    )
+    assert [(r.selectors, r.body, r.context) for r in rules] == [
+        (["a", "b"], "x:1", ()),
+        ([".c"], "y:2", ("@layer base", "@media (min-width:768px)")),
+    ]
+
+
+def test_critical_css_keeps_matching_rules_in_their_blocks():
+    index = SelectorIndex.build(
+        "*{m:0}.a{x:1}.b{x:2}@media (min-width:768px){.md\\:a{y:1}.md\\:b{y:2}}"
+    )
+    assert index.critical_css({".a", ".md:a"}) == "*{m:0}.a{x:1}@media (min-width:768px){.md\\:a{y:1}}"
+
+
+def test_fold_collector_takes_header_and_first_main_children():
+    collector = FoldCollector(fold_sections=2)
+    collector.feed(
+        '<html><body class="bg"><header class="h"><img class="logo"></header>'
+        '<main id="m"><section class="s1"><br></section><section class="s2"></section>'
+        '<section class="s3"><p class="deep"></p></section></main>'
+        '<footer class="f"></footer></body></html>'
+    )
+    assert collector.tokens == {
+        "html", "body", ".bg", "header", ".h", "img", ".logo", "main", "#m",
+        "section", ".s1", "br", ".s2",
+    }
+
+
+def _dist(tmp_path, body):
+    (tmp_path / "_astro").mkdir()
+    (tmp_path / "_astro" / "i.css").write_text(
+        ".px-4{p:4}.x{a:b}@media (min-width:768px){.md\\:px-8{p:8}}"
+    )
+    page = tmp_path / "index.html"
+    page.write_text(
+        '<html><head><link rel="stylesheet" href="/portfolio/_astro/i.css">'
+        f"<meta name=x></head><body>{body}</body></html>"
+    )
+    return page
+
+
+def test_process_page_inlines_before_the_async_stylesheet(tmp_path):
+    page = _dist(tmp_path, '<header class="px-4 md:px-8"></header>')
+    assert process_page(page, tmp_path, {}, 2)
+    html = page.read_text()
+    style = html.index("<style data-critical>")
+    assert style < html.index('rel="preload"') < html.index("<noscript>")
+    assert ".px-4{p:4}" in html and ".x{a:b}" not in html
+
+
+def test_process_page_runs_once(tmp_path):
+    page = _dist(tmp_path, '<p>mentions data-critical in text</p><main><section class="x"></section></main>')
+    assert process_page(page, tmp_path, {}, 2)
+    processed = page.read_text()
+    assert process_page(page, tmp_path, {}, 2) == 0
+    assert page.read_text() == processed
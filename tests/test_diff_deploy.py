@@ -0,0 +1,55 @@
+import pytest
+
+from diff_deploy import LocalTarget, main, upload_order
+
+
+def test_upload_order_puts_html_last():
+    paths = ["index.html", "_astro/app.123.css", "docs/index.html", "og.png"]
+    assert upload_order(paths) == ["_astro/app.123.css", "og.png", "docs/index.html", "index.html"]
+
+
+def test_local_target_delta_and_manifest_outside_root(tmp_path):
+    site, mirror = tmp_path / "site", tmp_path / "mirror"
+    (site / "docs").mkdir(parents=True)
+    (site / "index.html").write_text("1")
+    (site / "docs" / "page.html").write_text("2")
+    assert main([str(site), "--target", str(mirror)]) == 0
+
+    (site / "index.html").write_text("changed")
+    (site / "docs" / "page.html").unlink()
+    (site / "app.js").write_text("3")
+    assert main([str(site), "--target", str(mirror)]) == 0
+
+    assert sorted(p.relative_to(mirror).as_posix() for p in mirror.rglob("*")) == [
+        "app.js", "index.html",
+    ]
+    assert (mirror / "index.html").read_text() == "changed"
+    assert LocalTarget(str(mirror)).manifest == tmp_path / "mirror.manifest.json"
+    assert (tmp_path / "mirror.manifest.json").is_file()
+
+
+def test_local_target_rejects_filesystem_root():
+    with pytest.raises(SystemExit):
+        LocalTarget("/")
+
+
+def test_local_target_without_manifest_removes_stale_files(tmp_path):
+    site, mirror = tmp_path / "site", tmp_path / "mirror"
+    site.mkdir()
+    (site / "index.html").write_text("new")
+    (mirror / "old").mkdir(parents=True)
+    (mirror / "old" / "stale.html").write_text("stale")
+    (mirror / "index.html").write_text("new")
+
+    assert main([str(site), "--target", str(mirror)]) == 0
+
+    assert [p.relative_to(mirror).as_posix() for p in mirror.rglob("*")] == ["index.html"]
+    assert (tmp_path / "mirror.manifest.json").is_file()
+
+
+def test_local_target_upload_leaves_no_temporary_files(tmp_path):
+    source = tmp_path / "a.css"
+    source.write_text("x")
+    target = LocalTarget(str(tmp_path / "mirror"))
+    target.upload("assets/a.css", source)
+    assert [p.name for p in (tmp_path / "mirror" / "assets").iterdir()] == ["a.css"]
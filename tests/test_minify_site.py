@@ -0,0 +1,104 @@
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from minify_site import is_minified, minify_css, minify_html, minify_js
+
+
+@pytest.mark.parametrize("keyword", ["return", "typeof", "void", "delete", "throw", "yield"])
+def test_js_regex_after_keyword(keyword):
+    assert minify_js(f"{keyword} / +/.test(s)") == f"{keyword}/ +/.test(s)"
+
+
+def test_js_division_is_not_a_regex():
+    assert minify_js("a = b / 2 / c") == "a=b/2/c"
+    assert minify_js("n = total / count // per item") == "n=total/count"
+
+
+def test_js_line_comment_marker_inside_regex():
+    src = "x=function(u){return/^\\/\\//.test(u)};y()"
+    assert minify_js(src) == src
+
+
+def test_js_template_literal_with_brace_in_expression():
+    src = "const t = `a ${ '}' } b ${ `c${ d }` }`;  f()"
+    assert minify_js(src) == "const t=`a ${ '}' } b ${ `c${ d }` }`;f()"
+
+
+def test_js_keeps_line_breaks_needed_for_asi():
+    assert minify_js("let a = 1\nlet b = a\n++c\n") == "let a=1\nlet b=a\n++c"
+    assert minify_js("return\nvalue") == "return\nvalue"
+    assert minify_js("a = b + +c; d = e - -f") == "a=b+ +c;d=e- -f"
+
+
+ASI_AFTER_BRACE = [
+    ("const a = {}\nconst b = 1", "const a={}\nconst b=1"),
+    ("const f = () => {\n  g()\n}\nconst h = 1", "const f=()=>{g()}\nconst h=1"),
+    ("let o = {a: 1}\nfoo()", "let o={a:1}\nfoo()"),
+]
+
+
+@pytest.mark.parametrize("src, expected", ASI_AFTER_BRACE)
+def test_js_keeps_line_break_after_closing_brace(src, expected):
+    assert minify_js(src) == expected
+
+
+@pytest.mark.skipif(not shutil.which("node"), reason="node is not installed")
+@pytest.mark.parametrize("src", [src for src, _ in ASI_AFTER_BRACE] + [
+    "x = 1 .toString()\nlet y = a\n++b",
+    "function g(s){return / +/.test(s)}\nconst r = 0x1f .toString()",
+])
+def test_js_output_parses_with_node(src, tmp_path):
+    script = tmp_path / "out.js"
+    script.write_text(minify_js(src))
+    subprocess.run(["node", "--check", str(script)], check=True)
+
+
+def test_js_keeps_space_before_dot_after_number():
+    assert minify_js("x = 1 .toString()") == "x=1 .toString()"
+    assert minify_js("x = a1 .b") == "x=a1.b"
+
+
+def test_js_drops_line_breaks_after_block_open():
+    assert minify_js("if (a) {\n  b()\n}\n") == "if(a){b()}"
+
+
+def test_css_strips_comments_and_last_semicolon():
+    assert minify_css("/* c */\na :hover {\n  content : \"x  y\" ;\n}") == 'a :hover{content : "x  y"}'
+
+
+def test_css_comment_between_tokens_separates_them():
+    assert minify_css("a{margin:0/**/auto}") == "a{margin:0 auto}"
+    assert minify_css("a{margin:0 /* x */ auto}") == "a{margin:0 auto}"
+    assert minify_css("a{x:1}/* x */b{y:2}") == "a{x:1}b{y:2}"
+
+
+def test_html_preserves_pre_and_textarea():
+    src = "<div>\n  a    b\n</div><pre>  x\n   y </pre><textarea>  1\n  2</textarea>"
+    assert minify_html(src) == "<div> a b </div><pre>  x\n   y </pre><textarea>  1\n  2</textarea>"
+
+
+def test_html_minifies_js_scripts_only():
+    src = (
+        '<script type="module">\n  let a = 1 // c\n</script>'
+        '<script type="application/ld+json">{ "a":  1 }</script>'
+        '<script type="text/x-template"><p>  x  </p></script>'
+    )
+    assert minify_html(src) == (
+        '<script type="module">let a=1</script>'
+        '<script type="application/ld+json">{ "a":  1 }</script>'
+        '<script type="text/x-template"><p>  x  </p></script>'
+    )
+
+
+def test_html_drops_comments_but_keeps_conditionals():
+    assert minify_html("<!-- x --><p>a</p><!--[if IE]>y<![endif]-->") == "<p>a</p><!--[if IE]>y<![endif]-->"
+
+
+def test_bundler_output_is_treated_as_minified():
+    assert is_minified(Path("_site/_astro/hoisted.abc.js"), b"a\n")
+    assert is_minified(Path("_site/docs/bundle.min.js"), b"a\n")
+    assert is_minified(Path("_site/app.js"), b"x" * 2000)
+    assert not is_minified(Path("_site/app.js"), b"let a = 1\n")